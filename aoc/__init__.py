@@ -27,6 +27,7 @@ from . import (
     day24,
     day25,
 )
+from .intcode_profile import profiling
 
 
 days = {
@@ -68,12 +69,17 @@ def print_answer(prefix, answer):
 
 
 def main():
-    argc = len(sys.argv)
+    args = sys.argv[1:]
+    profile = "--profile" in args
+    if profile:
+        args.remove("--profile")
+
+    argc = len(args) + 1
     if argc < 2 or argc > 3:
-        print("Usage: aoc <day> [input-file]")
+        print("Usage: aoc [--profile] <day> [input-file]")
         exit(0)
 
-    day = int(sys.argv[1])
+    day = int(args[0])
     solver = days.get(day, None)
     if solver is None:
         print("No solution for the given day ({})".format(day))
@@ -81,9 +87,18 @@ def main():
 
     path = f"data/day{day}.txt"
     if argc == 3:
-        path = sys.argv[2]
+        path = args[1]
+
+    if profile:
+        with profiling() as intcode_profile:
+            a, b = solver(path)
+    else:
+        a, b = solver(path)
 
-    a, b = solver(path)
     print_answer("A:", a)
     if b is not None:
         print_answer("B:", b)
+
+    if profile:
+        print()
+        print(intcode_profile.report())
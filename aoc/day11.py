@@ -1,10 +1,9 @@
 from collections import defaultdict
 
 from .common import coords_as_str
-from .intcode import load_program_from_file
+from .intcode import FusedInterpreter as Interpreter, load_program_from_file
 from .plane import Coord
 from .day8 import iter_chunks
-from .day9 import Interpreter
 
 
 class Robot:
@@ -4,8 +4,8 @@ from itertools import count
 from .common import dict_coords_as_str
 from .day12 import cmp
 from .day8 import iter_chunks
-from .day9 import Interpreter
 from .intcode import load_program_from_file
+from .intcode_jit import CompiledInterpreter as Interpreter
 from .plane import Coord
 
 
@@ -1,11 +1,13 @@
-import asyncio
-
 from collections import deque
 from itertools import count
 
 from .common import dict_coords_as_str
-from .day9 import Interpreter
-from .intcode import load_program_from_file
+from .intcode import (
+    FusedInterpreter as Interpreter,
+    load_program_from_file,
+    Op,
+    Process,
+)
 from .plane import Coord
 
 
@@ -73,8 +75,8 @@ class Maze:
 
 class Droid:
     """
-    Control interface for the repair droid. The given queues must be connected
-    to an intcode interpreter
+    Control interface for the repair droid. The given process must be running
+    the droid's intcode program
     """
 
     reverse_cmds = {
@@ -84,12 +86,11 @@ class Droid:
         4: 3,
     }
 
-    def __init__(self, cmd_queue, status_queue, start=None):
+    def __init__(self, process, start=None):
         if start is None:
             start = Coord(0, 0)
         self.pos = start
-        self.cmds = cmd_queue
-        self.status = status_queue
+        self.process = process
 
     def peek_move(self, cmd):
         if cmd == 1:
@@ -111,24 +112,20 @@ class Droid:
             if pos not in blacklist:
                 yield (cmd, pos)
 
-    async def move(self, cmd):
-        await self.cmds.put(cmd)
-        status = await self.status.get()
+    def move(self, cmd):
+        self.process.input.put(cmd)
+        self.process.run()
+        status = self.process.output.get()
         if status != 0:
             self.pos = self.peek_move(cmd)
         return status
 
-    async def reverse_move(self, cmd):
-        return await self.move(self.reverse_cmds[cmd])
+    def reverse_move(self, cmd):
+        return self.move(self.reverse_cmds[cmd])
 
 
-async def explore_maze(intcode, debug=False):
-    cmds = asyncio.Queue()
-    status = asyncio.Queue()
-    droid = Droid(cmds, status)
-    computer_task = asyncio.create_task(
-        Interpreter.async_run_program(intcode, cmds, status)
-    )
+def explore_maze(intcode, debug=False):
+    droid = Droid(Process(Interpreter(intcode)))
 
     goal = None
     tiles = {}
@@ -149,10 +146,10 @@ async def explore_maze(intcode, debug=False):
                 break
 
             # We backtrack one step
-            status = await droid.reverse_move(steps.pop())
+            status = droid.reverse_move(steps.pop())
             continue
 
-        status = await droid.move(cmd)
+        status = droid.move(cmd)
         tiles[next_pos] = status
         if status != 0:
             # Only modify the steps for backtracking if we actually moved
@@ -161,14 +158,52 @@ async def explore_maze(intcode, debug=False):
         if status == 2:
             goal = droid.pos
 
-    await Interpreter.shutdown_async_program(computer_task)
+    return Maze(coord for coord, tile in tiles.items() if tile == 0), goal
+
+
+def send_command(computer, cmd):
+    """Send a movement command to the droid's computer and return the status"""
+    it = computer.step_until_halt()
+
+    op = next(it)
+    assert op.code == Op.INPUT
+    computer.program[computer.read_output_param(op.modes[0])] = cmd
+
+    op = next(it)
+    assert op.code == Op.OUTPUT
+    return computer.read_input_param(op.modes[0])
+
+
+def map_maze(intcode):
+    """
+    Explore the maze breadth first without backtracking. Every explored
+    position keeps a fork of the computer as it was when the droid got there,
+    and each move is tried on a fork of that
+    """
+    start = Coord(0, 0)
+    goal = None
+    tiles = {start: 1}
+    unexplored = deque([(start, Interpreter(intcode))])
+    while unexplored:
+        pos, computer = unexplored.popleft()
+        droid = Droid(None, start=pos)
+        for cmd, next_pos in droid.iter_moves(blacklist=tiles):
+            fork = computer.fork()
+            status = send_command(fork, cmd)
+            tiles[next_pos] = status
+
+            if status != 0:
+                unexplored.append((next_pos, fork))
+            if status == 2:
+                goal = next_pos
+
     return Maze(coord for coord, tile in tiles.items() if tile == 0), goal
 
 
 def solve(path):
     intcode = load_program_from_file(path)
     start = Coord(0, 0)
-    maze, oxygen_system = asyncio.run(explore_maze(intcode))
+    maze, oxygen_system = map_maze(intcode)
     return (
         len(maze.shortest_path(start, oxygen_system)),
         len(maze.longest_shortest_path(oxygen_system)),
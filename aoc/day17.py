@@ -2,8 +2,7 @@ from collections import Counter
 from itertools import combinations
 
 from .common import last
-from .day9 import Interpreter
-from .intcode import load_program_from_file
+from .intcode import FusedInterpreter as Interpreter, load_program_from_file
 from .plane import Coord
 
 
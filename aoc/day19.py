@@ -1,8 +1,7 @@
 from itertools import count, islice
 
 from .common import coords_as_str
-from .day9 import Interpreter
-from .intcode import load_program_from_file
+from .intcode import FusedInterpreter as Interpreter, load_program_from_file
 from .plane import Coord
 
 
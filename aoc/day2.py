@@ -1,4 +1,5 @@
-from .intcode import InterpreterBase, load_program_from_file, Op
+from .intcode import InterpreterBase, load_program_from_file, Mode, Op
+from .intcode_batch import BatchInterpreter
 
 
 class Interpreter(InterpreterBase):
@@ -26,6 +27,182 @@ class Interpreter(InterpreterBase):
         self.program[target] = a * b
 
 
+class SymbolicError(Exception):
+    """Raised when a program needs a concrete value where it has a symbolic"""
+
+
+class Unknown:
+    """
+    Value read through a symbolic address. Anything computed from it is
+    unknown as well
+    """
+
+    def __add__(self, other):
+        return self
+
+    __radd__ = __mul__ = __rmul__ = __add__
+
+    def __repr__(self):
+        return "UNKNOWN"
+
+
+UNKNOWN = Unknown()
+
+
+class Polynomial:
+    """
+    Polynomial with integer coefficients over named variables. Terms map a
+    monomial, a sorted tuple of (variable, exponent) pairs, to its coefficient
+    """
+
+    __slots__ = ("terms",)
+
+    def __init__(self, terms):
+        self.terms = {m: c for m, c in terms.items() if c != 0}
+
+    @classmethod
+    def variable(cls, name):
+        return cls({((name, 1),): 1})
+
+    @classmethod
+    def lift(cls, value):
+        if isinstance(value, Polynomial):
+            return value
+        elif isinstance(value, int):
+            return cls({(): value})
+        return None
+
+    def simplify(self):
+        """Return a plain int if there are no variables left"""
+        if not self.terms:
+            return 0
+        elif len(self.terms) == 1 and () in self.terms:
+            return self.terms[()]
+        return self
+
+    def __add__(self, other):
+        other = Polynomial.lift(other)
+        if other is None:
+            return NotImplemented
+
+        terms = dict(self.terms)
+        for monomial, coeff in other.terms.items():
+            terms[monomial] = terms.get(monomial, 0) + coeff
+        return Polynomial(terms).simplify()
+
+    def __mul__(self, other):
+        other = Polynomial.lift(other)
+        if other is None:
+            return NotImplemented
+
+        terms = {}
+        for a_monomial, a_coeff in self.terms.items():
+            for b_monomial, b_coeff in other.terms.items():
+                exponents = dict(a_monomial)
+                for name, exp in b_monomial:
+                    exponents[name] = exponents.get(name, 0) + exp
+                monomial = tuple(sorted(exponents.items()))
+                terms[monomial] = terms.get(monomial, 0) + a_coeff * b_coeff
+        return Polynomial(terms).simplify()
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def __call__(self, **values):
+        total = 0
+        for monomial, coeff in self.terms.items():
+            for name, exp in monomial:
+                coeff *= values[name] ** exp
+            total += coeff
+        return total
+
+    def coeff(self, *monomial):
+        return self.terms.get(tuple(sorted(monomial)), 0)
+
+    def __repr__(self):
+        def fmt_term(monomial, coeff):
+            factors = [name if exp == 1 else f"{name}^{exp}" for name, exp in monomial]
+            if coeff != 1 or not factors:
+                factors.insert(0, str(coeff))
+            return "*".join(factors)
+
+        terms = sorted(self.terms.items(), reverse=True)
+        return " + ".join(fmt_term(m, c) for m, c in terms)
+
+
+def is_symbolic(value):
+    return isinstance(value, (Polynomial, Unknown))
+
+
+class SymbolicInterpreter(Interpreter):
+    """
+    Interpreter that allows memory to hold polynomials. Reading through a
+    symbolic address gives an unknown value, while writing through one or
+    executing a symbolic instruction raises SymbolicError
+    """
+
+    def read_opcode(self):
+        if is_symbolic(self.program[self.ptr]):
+            raise SymbolicError(f"Symbolic instruction at {self.ptr}")
+        return super().read_opcode()
+
+    def read_input_param(self, mode):
+        if mode != Mode.IMMEDIATE and is_symbolic(self.program[self.ptr]):
+            self.ptr += 1
+            return UNKNOWN
+        return super().read_input_param(mode)
+
+    def read_output_param(self, mode):
+        if is_symbolic(self.program[self.ptr]):
+            raise SymbolicError(f"Symbolic write address at {self.ptr}")
+        return super().read_output_param(mode)
+
+
+def run_symbolic(program):
+    """
+    Run the program with noun and verb as unknowns and return address 0 as a
+    polynomial in them, or a plain int if it doesn't depend on them
+    """
+    program = list(program)
+    program[1] = Polynomial.variable("noun")
+    program[2] = Polynomial.variable("verb")
+
+    computer = SymbolicInterpreter(program)
+    for op in computer.step_until_halt():
+        raise ValueError(f"Unknown opcode {op!r}")
+
+    result = computer.program[0]
+    if isinstance(result, Unknown):
+        raise SymbolicError("Result depends on a symbolic address")
+    return result
+
+
+def solve_noun_and_verb(formula, target):
+    """Find the first noun and verb in 0..99 for which the formula is target"""
+    formula = Polynomial.lift(formula)
+    nouns = range(100)
+    verbs = range(100)
+
+    # For result = f(noun) + b * verb we only need to try every noun
+    b = formula.coeff(("verb", 1))
+    linear_in_verb = all(
+        m == (("verb", 1),) or "verb" not in dict(m) for m in formula.terms
+    )
+    if linear_in_verb and b != 0:
+        for noun in nouns:
+            rest = target - formula(noun=noun, verb=0)
+            verb, remainder = divmod(rest, b)
+            if remainder == 0 and verb in verbs:
+                return noun, verb
+        return None
+
+    for noun in nouns:
+        for verb in verbs:
+            if formula(noun=noun, verb=verb) == target:
+                return noun, verb
+    return None
+
+
 def run_program(program, noun=None, verb=None):
     program = list(program)
 
@@ -41,12 +218,28 @@ def run_program(program, noun=None, verb=None):
 
 
 def find_noun_and_verb(program):
-    for noun in range(100):
-        for verb in range(100):
-            b = run_program(program, noun, verb)
-
-            if b[0] == 19690720:
-                return 100 * noun + verb
+    try:
+        formula = run_symbolic(program)
+    except SymbolicError:
+        return find_noun_and_verb_concrete(program)
+
+    solution = solve_noun_and_verb(formula, 19690720)
+    if solution is not None:
+        noun, verb = solution
+        return 100 * noun + verb
+
+
+def find_noun_and_verb_concrete(program):
+    # Try every combination at once, in the same order as a nested loop would
+    pairs = [(noun, verb) for noun in range(100) for verb in range(100)]
+    batch = BatchInterpreter(program, len(pairs))
+    batch.patch(1, [noun for noun, _ in pairs])
+    batch.patch(2, [verb for _, verb in pairs])
+    batch.run()
+
+    for (noun, verb), result in zip(pairs, batch.memory[:, 0].tolist()):
+        if result == 19690720:
+            return 100 * noun + verb
 
 
 def solve(path):
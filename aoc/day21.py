@@ -1,5 +1,5 @@
-from .day9 import Interpreter
 from .intcode import load_program_from_file
+from .intcode_jit import CompiledInterpreter as Interpreter
 
 
 def springscript_compile(lines):
@@ -1,8 +1,7 @@
 from click import getchar
 from collections import deque
 
-from .day9 import Interpreter
-from .intcode import load_program_from_file, Op
+from .intcode import FusedInterpreter as Interpreter, load_program_from_file, Op
 
 
 def get_selection(items):
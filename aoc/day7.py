@@ -1,10 +1,12 @@
-import asyncio
-
 from collections import deque
 from itertools import cycle, islice, permutations
 
-from .day5 import Interpreter
-from .intcode import load_program_from_file, Op
+from .intcode import (
+    Channel,
+    FusedInterpreter as Interpreter,
+    load_program_from_file,
+    Scheduler,
+)
 
 
 def find_thruster_signal(intcode, phase_settings):
@@ -14,44 +16,21 @@ def find_thruster_signal(intcode, phase_settings):
     return prev_output
 
 
-def async_queue_from_iter(it):
-    queue = asyncio.Queue()
-    for item in it:
-        queue.put_nowait(item)
-    return queue
-
-
-async def async_run_program(program, input_queue, output_queue):
-    computer = Interpreter(program)
-    for op in computer.step_until_halt():
-        if op.code == Op.INPUT:
-            target = computer.read_output_param(op.modes[0])
-            computer.program[target] = await input_queue.get()
-        elif op.code == Op.OUTPUT:
-            await output_queue.put(computer.read_input_param(op.modes[0]))
-        else:
-            raise ValueError(f"Unexpected OP-code {op!r}")
+def find_thruster_signal_with_feedback(intcode, phase_settings):
+    channels = [Channel([phase_setting]) for phase_setting in phase_settings]
 
-
-async def find_thruster_signal_with_feedback(intcode, phase_settings):
-    input_queues = [
-        async_queue_from_iter([phase_setting]) for phase_setting in phase_settings
-    ]
-
-    # Add initial zero to first amplifier's queue
-    await input_queues[0].put(0)
+    # Add initial zero to first amplifier's channel
+    channels[0].put(0)
 
     # Start amplifier programs and hook them up to the correct IO
-    output_queue_iter = islice(cycle(input_queues), 1, None)
-    amplifiers = [
-        async_run_program(intcode, input_queue, output_queue)
-        for input_queue, output_queue in zip(input_queues, output_queue_iter)
-    ]
-
-    await asyncio.gather(*amplifiers)
+    scheduler = Scheduler()
+    output_channel_iter = islice(cycle(channels), 1, None)
+    for input_channel, output_channel in zip(channels, output_channel_iter):
+        scheduler.add(Interpreter(intcode), input_channel, output_channel)
+    scheduler.run()
 
-    # There should be one item in the first amplifier's queue waiting for us
-    return await input_queues[0].get()
+    # There should be one item in the first amplifier's channel waiting for us
+    return channels[0].get()
 
 
 def solve(path):
@@ -61,7 +40,7 @@ def solve(path):
         for phase_settings in permutations(range(5))
     )
     b = max(
-        asyncio.run(find_thruster_signal_with_feedback(intcode, phase_settings))
+        find_thruster_signal_with_feedback(intcode, phase_settings)
         for phase_settings in permutations(range(5, 10))
     )
 
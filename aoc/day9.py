@@ -1,7 +1,6 @@
-from collections import defaultdict
-
 from .common import last
-from .intcode import load_program_from_file, Op
+from .intcode import load_program_from_file, Memory, Op
+from .intcode_jit import CompiledInterpreter
 from .day5 import Interpreter as PrevInterpreter
 
 
@@ -15,10 +14,9 @@ class Interpreter(PrevInterpreter):
             ops.update(op_overrides.items())
 
         # We don't send the real program to the parent since we will override
-        # it with a defaultdict anyway. This is required since the memory is
-        # unbounded
+        # it with unbounded memory anyway
         super().__init__([], ops)
-        self.program = defaultdict(int, enumerate(program))
+        self.program = Memory(program)
 
     def set_rel_base(self, op):
         self.rel_base += self.read_input_param(op.modes[0])
@@ -26,7 +24,7 @@ class Interpreter(PrevInterpreter):
 
 def solve(path):
     intcode = load_program_from_file(path)
-    a = last(Interpreter.run_program(intcode, [1]))
-    b = last(Interpreter.run_program(intcode, [2]))
+    a = last(CompiledInterpreter.run_program(intcode, [1]))
+    b = last(CompiledInterpreter.run_program(intcode, [2]))
 
     return (a, b)
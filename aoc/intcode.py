@@ -1,7 +1,9 @@
 import asyncio
+import copy
 
+from collections import deque
 from enum import Enum, IntEnum
-from itertools import count
+from time import perf_counter
 
 
 class Mode:
@@ -23,33 +25,80 @@ class Op(IntEnum):
     EXIT = 99
 
 
-class ModeDict(dict):
-    __slots__ = ()
-
-    def __missing__(self, key):
-        return 0
+# Number of parameters for every instruction
+num_params = {
+    Op.ADD: 3,
+    Op.MUL: 3,
+    Op.INPUT: 1,
+    Op.OUTPUT: 1,
+    Op.JMP_IF_TRUE: 2,
+    Op.JMP_IF_FALSE: 2,
+    Op.LT: 3,
+    Op.EQ: 3,
+    Op.SET_REL_BASE: 1,
+    Op.EXIT: 0,
+}
 
 
 class Opcode:
+    """
+    Decoded instruction word. Instances are immutable so they can be shared
+    through the decode cache (see decode_opcode)
+    """
+
     __slots__ = ("code", "modes")
 
     def __init__(self, code):
-        self.code = Op(code % 100)
-
-        modes = ModeDict()
         int_modes = code // 100
-        for i in count():
-            if int_modes == 0:
-                break
-            modes[i] = int_modes % 10
-            int_modes //= 10
-        self.modes = modes
+        modes = (int_modes % 10, int_modes // 10 % 10, int_modes // 100 % 10)
+
+        object.__setattr__(self, "code", Op(code % 100))
+        object.__setattr__(self, "modes", modes)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
     def __repr__(self):
-        return f"Opcode(code={self.code!r}, modes={self.modes.items()})"
+        return f"Opcode(code={self.code!r}, modes={self.modes!r})"
+
+
+_opcode_cache = {}
+
+
+def decode_opcode(word):
+    """Return the cached Opcode for the given instruction word"""
+    try:
+        return _opcode_cache[word]
+    except KeyError:
+        op = _opcode_cache[word] = Opcode(word)
+        return op
+
+
+class Snapshot:
+    """Saved interpreter state, see InterpreterBase.snapshot()"""
+
+    __slots__ = ("program", "ptr", "rel_base")
+
+    def __init__(self, program, ptr, rel_base):
+        self.program = program
+        self.ptr = ptr
+        self.rel_base = rel_base
+
+
+def fork_memory(program):
+    if isinstance(program, Memory):
+        return program.fork()
+    return list(program)
 
 
 class InterpreterBase:
+    # Statistics are recorded into this object when it's set, see
+    # intcode_profile. Setting it on the class profiles every machine
+    profile = None
+
+    # Trace recorder from intcode_trace. Works like profile
+    trace = None
+
     def __init__(self, program, op_overrides=None):
         self.ptr = 0
         self.rel_base = 0
@@ -59,10 +108,12 @@ class InterpreterBase:
             self.ops.update(op_overrides.items())
 
     @classmethod
-    def run_program(cls, program, input=None):
+    def run_program(cls, program, input=None, profile=None):
         """Run program with iterator based input and output"""
         input_iter = iter([] if input is None else input)
         computer = cls(program)
+        if profile is not None:
+            computer.profile = profile
         for op in computer.step_until_halt():
             if op.code == Op.INPUT:
                 target = computer.read_output_param(op.modes[0])
@@ -73,8 +124,10 @@ class InterpreterBase:
                 raise ValueError(f"Unexpected OP-code {op!r}")
 
     @classmethod
-    async def async_run_program(cls, program, input_queue, output_queue):
+    async def async_run_program(cls, program, input_queue, output_queue, profile=None):
         computer = cls(program)
+        if profile is not None:
+            computer.profile = profile
         for op in computer.step_until_halt():
             if op.code == Op.INPUT:
                 target = computer.read_output_param(op.modes[0])
@@ -93,7 +146,12 @@ class InterpreterBase:
             pass
 
     def read_opcode(self):
-        return Opcode(self.read_input_param(Mode.IMMEDIATE))
+        if self.ptr < 0:
+            raise IndexError("Tried to read outside of memory")
+
+        op = decode_opcode(self.program[self.ptr])
+        self.ptr += 1
+        return op
 
     def read_input_param(self, mode):
         if mode == Mode.POS:
@@ -129,7 +187,41 @@ class InterpreterBase:
         self.ptr += 1
         return pos
 
+    def fork(self):
+        """
+        Return an independent copy of this machine that continues from the same
+        state. Memory is shared until either machine writes to it
+        """
+        other = copy.copy(self)
+        other.program = fork_memory(self.program)
+
+        # Rebind instruction handlers that are methods of this instance
+        other.ops = {
+            code: (
+                getattr(other, func.__name__)
+                if getattr(func, "__self__", None) is self
+                else func
+            )
+            for code, func in self.ops.items()
+        }
+        return other
+
+    def snapshot(self):
+        """Save the current state. Memory is shared until it's written to"""
+        return Snapshot(fork_memory(self.program), self.ptr, self.rel_base)
+
+    def restore(self, snapshot):
+        """Return to the given state. A snapshot can be restored many times"""
+        self.program = fork_memory(snapshot.program)
+        self.ptr = snapshot.ptr
+        self.rel_base = snapshot.rel_base
+
     def step_until_halt(self):
+        instrumented = self.instrumented_step_until_halt()
+        if instrumented is not None:
+            yield from instrumented
+            return
+
         while True:
             op = self.read_opcode()
             func = self.ops.get(op.code)
@@ -141,6 +233,480 @@ class InterpreterBase:
             else:
                 yield op
 
+    def instrumented_step_until_halt(self):
+        """
+        Return the generator to use instead of the normal step_until_halt()
+        loop when the machine is traced or profiled, otherwise None
+        """
+        if self.trace is not None:
+            return self.trace.record(self)
+        elif self.profile is not None:
+            return self.profiled_step_until_halt()
+        return None
+
+    def execute_one(self, op):
+        """
+        Execute op, whose opcode has just been read. Returns False if the
+        instruction must be handled by the caller of step_until_halt()
+        """
+        func = self.ops.get(op.code)
+        if func is None:
+            return False
+        func(op)
+        return True
+
+    def profiled_step_until_halt(self):
+        """
+        Same as step_until_halt(), but executes one instruction at a time and
+        records what it does into self.profile. Time spent executing and time
+        spent waiting for the caller to handle INPUT and OUTPUT are measured
+        separately
+        """
+        profile = self.profile
+        opcodes = profile.opcodes
+        addresses = profile.addresses
+        profile.machines += 1
+
+        start = perf_counter()
+        while True:
+            addr = self.ptr
+            op = self.read_opcode()
+            opcodes[op.code] += 1
+            addresses[addr] += 1
+
+            if op.code is Op.EXIT:
+                profile.exec_time += perf_counter() - start
+                return
+            elif self.execute_one(op):
+                continue
+
+            paused = perf_counter()
+            profile.exec_time += paused - start
+            yield op
+            start = perf_counter()
+            if op.code is Op.INPUT:
+                profile.input_time += start - paused
+            else:
+                profile.output_time += start - paused
+
+
+class Memory:
+    """
+    Unbounded Intcode memory. Cells live in one list that grows a page at a
+    time when something is written past the end. Unwritten cells read as zero
+    and negative addresses are rejected.
+
+    Memory can be forked cheaply. Both copies share the same list until one of
+    them writes to it, which makes that side copy it first.
+
+    Interpreter loops that want to index the list directly must get it through
+    writable(). It's only grown in place after that, so holding on to it is
+    safe until the memory is forked again.
+    """
+
+    __slots__ = ("cells", "shared")
+
+    page_size = 1024
+
+    def __init__(self, program=()):
+        self.cells = list(program)
+        self.shared = False
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __getitem__(self, addr):
+        if addr < 0:
+            raise IndexError("Tried to read outside of memory")
+
+        try:
+            return self.cells[addr]
+        except IndexError:
+            return 0
+
+    def __setitem__(self, addr, value):
+        if addr < 0:
+            raise IndexError("Tried to write outside of memory")
+
+        cells = self.writable()
+        try:
+            cells[addr] = value
+        except IndexError:
+            self.reserve(addr + 1)
+            cells[addr] = value
+
+    def fork(self):
+        """Return a copy of this memory that shares cells until written to"""
+        other = Memory.__new__(Memory)
+        other.cells = self.cells
+        other.shared = self.shared = True
+        return other
+
+    def writable(self):
+        """Return the cell list, copying it first if it's shared"""
+        if self.shared:
+            self.cells = list(self.cells)
+            self.shared = False
+        return self.cells
+
+    def reserve(self, size):
+        """Grow memory so that it holds at least size cells"""
+        cells = self.writable()
+        if size > len(cells):
+            size = -(-size // self.page_size) * self.page_size
+            cells.extend([0] * (size - len(cells)))
+
+
+class FusedInterpreter(InterpreterBase):
+    """
+    Interpreter that executes every built in instruction in one loop using
+    local variables, instead of dispatching to a bound method per instruction.
+    INPUT and OUTPUT are yielded from step_until_halt() exactly like the
+    layered interpreters do, so it's a drop in replacement for them. Memory is
+    unbounded like for day 9's interpreter.
+    """
+
+    def __init__(self, program, op_overrides=None):
+        super().__init__([], op_overrides)
+        self.program = Memory(program)
+
+    def step_until_halt(self):
+        instrumented = self.instrumented_step_until_halt()
+        if instrumented is not None:
+            yield from instrumented
+            return
+
+        while True:
+            op = self.run_until_io()
+            if op is None:
+                return
+            yield op
+
+    def execute_one(self, op):
+        if op.code in self.ops:
+            return super().execute_one(op)
+        elif op.code in (Op.INPUT, Op.OUTPUT):
+            return False
+
+        self.ptr -= 1
+        self.interpret_one()
+        return True
+
+    def run_until_io(self):
+        """
+        Execute instructions until an INPUT or OUTPUT instruction is reached,
+        or the program exits. The pointer is left at the first parameter of the
+        I/O instruction, which is returned. Returns None on EXIT
+        """
+        mem = self.program.writable()
+        ops = self.ops
+        ip = self.ptr
+        rb = self.rel_base
+        decode = _opcode_cache
+
+        if ip < 0:
+            raise IndexError("Tried to read outside of memory")
+
+        while True:
+            # The loop indexes the cell list directly. Anything that would end
+            # up outside of it raises IndexError, and that instruction is then
+            # executed by interpret_one() which grows memory as needed
+            try:
+                word = mem[ip]
+                op = decode.get(word)
+                if op is None:
+                    op = decode_opcode(word)
+                code = op.code
+                m1, m2, m3 = op.modes
+
+                if ops and code in ops:
+                    pass
+                elif code == 1 or code == 2 or code == 7 or code == 8:
+                    a = mem[ip + 1]
+                    if m1 == 0:
+                        if a < 0:
+                            raise IndexError()
+                        a = mem[a]
+                    elif m1 == 2:
+                        a += rb
+                        if a < 0:
+                            raise IndexError()
+                        a = mem[a]
+                    b = mem[ip + 2]
+                    if m2 == 0:
+                        if b < 0:
+                            raise IndexError()
+                        b = mem[b]
+                    elif m2 == 2:
+                        b += rb
+                        if b < 0:
+                            raise IndexError()
+                        b = mem[b]
+                    c = mem[ip + 3]
+                    if m3 == 2:
+                        c += rb
+                    elif m3 == 1:
+                        raise ValueError("Output parameters can't be immediate")
+                    if c < 0:
+                        raise IndexError()
+
+                    if code == 1:
+                        mem[c] = a + b
+                    elif code == 2:
+                        mem[c] = a * b
+                    elif code == 7:
+                        mem[c] = int(a < b)
+                    else:
+                        mem[c] = int(a == b)
+                    ip += 4
+                    continue
+                elif code == 5 or code == 6:
+                    a = mem[ip + 1]
+                    if m1 == 0:
+                        if a < 0:
+                            raise IndexError()
+                        a = mem[a]
+                    elif m1 == 2:
+                        a += rb
+                        if a < 0:
+                            raise IndexError()
+                        a = mem[a]
+                    if (code == 5) == bool(a):
+                        b = mem[ip + 2]
+                        if m2 == 0:
+                            if b < 0:
+                                raise IndexError()
+                            b = mem[b]
+                        elif m2 == 2:
+                            b += rb
+                            if b < 0:
+                                raise IndexError()
+                            b = mem[b]
+                        if b < 0:
+                            raise IndexError()
+                        ip = b
+                    else:
+                        ip += 3
+                    continue
+                elif code == 9:
+                    a = mem[ip + 1]
+                    if m1 == 0:
+                        if a < 0:
+                            raise IndexError()
+                        a = mem[a]
+                    elif m1 == 2:
+                        a += rb
+                        if a < 0:
+                            raise IndexError()
+                        a = mem[a]
+                    rb += a
+                    ip += 2
+                    continue
+                elif code == 99:
+                    self.ptr = ip + 1
+                    self.rel_base = rb
+                    return None
+                else:
+                    self.ptr = ip + 1
+                    self.rel_base = rb
+                    return op
+            except IndexError:
+                self.ptr = ip
+                self.rel_base = rb
+                self.interpret_one()
+                ip = self.ptr
+                rb = self.rel_base
+                if ip < 0:
+                    raise IndexError("Tried to read outside of memory")
+                continue
+
+            # Only overridden instructions end up here
+            self.ptr = ip + 1
+            self.rel_base = rb
+            ops[code](op)
+            ip = self.ptr
+            rb = self.rel_base
+
+    def interpret_one(self):
+        """
+        Execute the non I/O instruction at the pointer using the bounds checked
+        memory accessors. Memory is first grown to hold every address the
+        instruction touches. Returns the address written to, if any
+        """
+        op = decode_opcode(self.program[self.ptr])
+        if op.code in (Op.INPUT, Op.OUTPUT, Op.EXIT):
+            raise ValueError(f"Can't interpret I/O instruction {op!r}")
+
+        addresses = [
+            self.program[self.ptr + i + 1] + (self.rel_base if mode else 0)
+            for i, mode in enumerate(op.modes[: num_params[op.code]])
+            if mode != Mode.IMMEDIATE
+        ]
+        if addresses:
+            self.program.reserve(max(addresses) + 1)
+
+        self.ptr += 1
+        a = self.read_input_param(op.modes[0])
+        if op.code is Op.SET_REL_BASE:
+            self.rel_base += a
+            return None
+
+        b = self.read_input_param(op.modes[1])
+        if op.code in (Op.JMP_IF_TRUE, Op.JMP_IF_FALSE):
+            if bool(a) == (op.code is Op.JMP_IF_TRUE):
+                self.ptr = b
+            return None
+
+        target = self.read_output_param(op.modes[2])
+        if op.code is Op.ADD:
+            self.program[target] = a + b
+        elif op.code is Op.MUL:
+            self.program[target] = a * b
+        elif op.code is Op.LT:
+            self.program[target] = int(a < b)
+        else:
+            self.program[target] = int(a == b)
+        return target
+
+
+class Channel(deque):
+    """FIFO of values passed between machines"""
+
+    put = deque.append
+    get = deque.popleft
+
+
+class State(Enum):
+    READY = "ready"
+    BLOCKED = "blocked"
+    IDLE = "idle"
+    HALTED = "halted"
+
+
+class Process:
+    """
+    A machine connected to an input and an output channel. run() executes it
+    until it needs input that isn't there or exits. output can be anything
+    with a put() method.
+
+    When default is given, reading from an empty channel reads default instead
+    of blocking and ends the run. If the machine neither received nor sent
+    anything during that run it's considered IDLE, meaning it's polling and
+    won't do anything useful until its channel has something in it.
+    """
+
+    def __init__(self, machine, input=None, output=None, default=None, priority=0):
+        self.machine = machine
+        self.input = Channel() if input is None else input
+        self.output = Channel() if output is None else output
+        self.default = default
+        self.priority = priority
+        self.state = State.READY
+        self.steps = machine.step_until_halt()
+
+        # Address the machine is waiting to have input written to
+        self.target = None
+
+    @property
+    def runnable(self):
+        if self.state is State.READY:
+            return True
+        return self.state is not State.HALTED and len(self.input) > 0
+
+    def run(self):
+        machine = self.machine
+        active = False
+
+        if self.target is not None:
+            if not self.input:
+                return
+            machine.program[self.target] = self.input.get()
+            self.target = None
+            active = True
+
+        self.state = State.READY
+        for op in self.steps:
+            if op.code is Op.INPUT:
+                target = machine.read_output_param(op.modes[0])
+                if self.input:
+                    machine.program[target] = self.input.get()
+                    active = True
+                elif self.default is not None:
+                    machine.program[target] = self.default
+                    if not active:
+                        self.state = State.IDLE
+                    return
+                else:
+                    self.target = target
+                    self.state = State.BLOCKED
+                    return
+            elif op.code is Op.OUTPUT:
+                self.output.put(machine.read_input_param(op.modes[0]))
+                active = True
+            else:
+                raise ValueError(f"Unexpected OP-code {op!r}")
+        self.state = State.HALTED
+
+
+class Scheduler:
+    """
+    Run processes cooperatively in a single thread. Every turn the runnable
+    process with the highest priority runs until it blocks, polls or exits.
+    Processes with equal priority take turns in the order they were added,
+    so scheduling is deterministic.
+    """
+
+    def __init__(self):
+        self.processes = []
+        self.next = 0
+
+    def add(self, machine, input=None, output=None, default=None, priority=0):
+        """Add a machine and return its Process"""
+        process = Process(machine, input, output, default, priority)
+        self.processes.append(process)
+        return process
+
+    @property
+    def states(self):
+        return [process.state for process in self.processes]
+
+    @property
+    def idle(self):
+        """True when no process can make progress until it gets more input"""
+        return not any(process.runnable for process in self.processes)
+
+    @property
+    def halted(self):
+        return all(process.state is State.HALTED for process in self.processes)
+
+    def step(self):
+        """Run the next process for one turn. Return it, or None if idle"""
+        processes = self.processes
+        n = len(processes)
+        best = None
+        for i in range(self.next, self.next + n):
+            process = processes[i % n]
+            if process.runnable and (
+                best is None or process.priority > best[1].priority
+            ):
+                best = (i % n, process)
+
+        if best is None:
+            return None
+
+        i, process = best
+        self.next = i + 1
+        process.run()
+        return process
+
+    def run(self):
+        """Run processes until every one is halted, blocked or idle"""
+        while self.step() is not None:
+            pass
+
 
 def load_program_from_file(path):
     with open(path) as f:
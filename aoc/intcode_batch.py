@@ -0,0 +1,194 @@
+import numpy as np
+
+from .intcode import Mode, Op, decode_opcode, num_params
+
+# Results at or above this magnitude don't fit in int64
+int64_limit = 2.0**63
+
+
+class BatchInterpreter:
+    """
+    Run many instances (lanes) of the same program in lockstep. Memory is a 2-D
+    array with one row per lane. Each round, lanes with the same pointer and
+    instruction word execute that instruction together using array operations,
+    so lanes that diverge are simply regrouped.
+
+    Memory is int64 until a result doesn't fit, at which point it's converted
+    to an object array of Python ints.
+    """
+
+    def __init__(self, program, lanes):
+        program = list(program)
+        try:
+            row = np.array(program, dtype=np.int64)
+        except OverflowError:
+            row = np.array(program, dtype=object)
+
+        self.memory = np.tile(row, (lanes, 1))
+        self.ptr = np.zeros(lanes, dtype=np.int64)
+        self.rel_base = np.zeros(lanes, dtype=np.int64)
+        self.halted = np.zeros(lanes, dtype=bool)
+
+    @property
+    def lanes(self):
+        return self.memory.shape[0]
+
+    def patch(self, addr, values):
+        """Set the given address to one value per lane"""
+        self.reserve(addr + 1)
+        values = list(values)
+        try:
+            self.memory[:, addr] = values
+        except OverflowError:
+            self.promote()
+            self.memory[:, addr] = values
+
+    def reserve(self, size):
+        """Make sure memory is at least size cells wide"""
+        width = self.memory.shape[1]
+        if size > width:
+            size = max(size, 2 * width)
+            self.memory = np.pad(self.memory, ((0, 0), (0, size - width)))
+
+    def promote(self):
+        """Switch memory to Python ints"""
+        if self.memory.dtype != object:
+            self.memory = self.memory.astype(object)
+
+    def run(self, inputs_per_lane=None):
+        """
+        Run every lane until it exits and return a list of outputs per lane.
+        Each lane reads its input from the corresponding list
+        """
+        if inputs_per_lane is None:
+            inputs_per_lane = [[]] * self.lanes
+        inputs = [list(lane_input) for lane_input in inputs_per_lane]
+        if len(inputs) != self.lanes:
+            raise ValueError("There must be one input list per lane")
+
+        input_pos = [0] * self.lanes
+        outputs = [[] for _ in range(self.lanes)]
+
+        active = np.flatnonzero(~self.halted)
+        while active.size:
+            ptrs = self.ptr[active]
+            for ptr in np.unique(ptrs):
+                if ptr < 0:
+                    raise IndexError("Tried to read outside of memory")
+                self.reserve(ptr + 4)
+
+                group = active[ptrs == ptr]
+                words = self.memory[group, ptr]
+                if (words == words[0]).all():
+                    self.execute(group, int(ptr), words[0], inputs, input_pos, outputs)
+                    continue
+
+                # Lanes have modified the code differently
+                for word in set(words.tolist()):
+                    self.execute(
+                        group[words == word],
+                        int(ptr),
+                        word,
+                        inputs,
+                        input_pos,
+                        outputs,
+                    )
+            active = np.flatnonzero(~self.halted)
+
+        return outputs
+
+    def address(self, group, ptr, mode):
+        operand = self.memory[group, ptr].astype(np.int64)
+        if mode == Mode.RELATIVE:
+            operand = operand + self.rel_base[group]
+        elif mode != Mode.POS:
+            raise ValueError(f"Mode must be 0 or 2, got {mode!r}")
+
+        if operand.min() < 0:
+            raise IndexError("Tried to read outside of memory")
+        self.reserve(int(operand.max()) + 1)
+        return operand
+
+    def read(self, group, ptr, mode):
+        if mode == Mode.IMMEDIATE:
+            return self.memory[group, ptr]
+        addr = self.address(group, ptr, mode)
+        return self.memory[group, addr]
+
+    def write(self, group, ptr, mode, values):
+        if mode == Mode.IMMEDIATE:
+            raise ValueError("Output parameters can't be immediate")
+        addr = self.address(group, ptr, mode)
+        self.memory[group, addr] = values
+
+    def execute(self, group, ptr, word, inputs, input_pos, outputs):
+        op = decode_opcode(int(word))
+        code = op.code
+        m1, m2, m3 = op.modes
+        next_ptr = ptr + num_params[code] + 1
+
+        if code in (Op.ADD, Op.MUL):
+            a = self.read(group, ptr + 1, m1)
+            b = self.read(group, ptr + 2, m2)
+            if self.memory.dtype != object:
+                a_float = a.astype(np.float64)
+                b_float = b.astype(np.float64)
+                if code is Op.ADD:
+                    overflow = np.abs(a_float + b_float) >= int64_limit
+                else:
+                    overflow = np.abs(a_float * b_float) >= int64_limit
+                if overflow.any():
+                    self.promote()
+                    a = a.astype(object)
+                    b = b.astype(object)
+            self.write(group, ptr + 3, m3, a + b if code is Op.ADD else a * b)
+        elif code in (Op.LT, Op.EQ):
+            a = self.read(group, ptr + 1, m1)
+            b = self.read(group, ptr + 2, m2)
+            result = a < b if code is Op.LT else a == b
+            self.write(group, ptr + 3, m3, result.astype(np.int64))
+        elif code in (Op.JMP_IF_TRUE, Op.JMP_IF_FALSE):
+            cond = self.read(group, ptr + 1, m1) != 0
+            if code is Op.JMP_IF_FALSE:
+                cond = ~cond
+            target = self.read(group, ptr + 2, m2).astype(np.int64)
+            self.ptr[group] = np.where(cond, target, next_ptr)
+            return
+        elif code is Op.SET_REL_BASE:
+            self.rel_base[group] += self.read(group, ptr + 1, m1).astype(np.int64)
+        elif code is Op.INPUT:
+            values = []
+            for lane in group.tolist():
+                pos = input_pos[lane]
+                if pos >= len(inputs[lane]):
+                    raise ValueError(f"Lane {lane} ran out of input")
+                values.append(inputs[lane][pos])
+                input_pos[lane] = pos + 1
+
+            try:
+                self.write(group, ptr + 1, m1, values)
+            except OverflowError:
+                self.promote()
+                self.write(group, ptr + 1, m1, values)
+        elif code is Op.OUTPUT:
+            values = self.read(group, ptr + 1, m1).tolist()
+            for lane, value in zip(group.tolist(), values):
+                outputs[lane].append(value)
+        elif code is Op.EXIT:
+            self.halted[group] = True
+
+        self.ptr[group] = next_ptr
+
+
+def run_batch(program, inputs_per_lane, patches=None):
+    """
+    Run one instance of program per input list in lockstep and return their
+    outputs. patches maps addresses to one value per lane that is written
+    before the program starts
+    """
+    inputs_per_lane = list(inputs_per_lane)
+    batch = BatchInterpreter(program, len(inputs_per_lane))
+    if patches is not None:
+        for addr, values in patches.items():
+            batch.patch(addr, values)
+    return batch.run(inputs_per_lane)
@@ -0,0 +1,330 @@
+from itertools import count
+
+from .intcode import FusedInterpreter, Mode, Op, decode_opcode, num_params
+
+# Instructions that can't be part of a compiled block. They are handed back to
+# the interpreter loop instead
+block_barriers = {Op.INPUT, Op.OUTPUT, Op.EXIT}
+
+# Upper limit on the number of instructions in a single block
+max_block_len = 64
+
+# Number of times an instruction word may be overwritten before we stop
+# compiling it and interpret it instead
+max_recompiles = 8
+
+# Returned by compiled blocks that touched memory outside of the cell list
+FAULT = -1
+
+# Compiled blocks shared between all machines. The key contains everything the
+# generated code depends on: start address, the words the block was compiled
+# from and which of those words are read from memory at runtime
+_block_cache = {}
+
+
+class Block:
+    __slots__ = ("start", "cells", "instructions", "func")
+
+    def __init__(self, start, cells, instructions, func):
+        self.start = start
+        self.cells = cells
+        self.instructions = instructions
+        self.func = func
+
+
+def scan_block(mem, start, interpreted=()):
+    """
+    Decode the basic block beginning at start. Return a list of (addr, opcode)
+    pairs. The block ends after a jump, before INPUT, OUTPUT or EXIT, before
+    instructions marked as interpreted and before invalid instructions
+    """
+    instructions = []
+    addr = start
+    while len(instructions) < max_block_len:
+        if addr in interpreted:
+            break
+
+        try:
+            op = decode_opcode(mem[addr])
+        except ValueError:
+            break
+
+        if op.code in block_barriers:
+            break
+
+        instructions.append((addr, op))
+        addr += num_params[op.code] + 1
+
+        if op.code in (Op.JMP_IF_TRUE, Op.JMP_IF_FALSE):
+            break
+    return instructions
+
+
+def compile_block(mem, start, instructions, dynamic):
+    """
+    Generate a Python function for the given instructions. The function takes
+    the memory cell list, the relative base and the watched code addresses,
+    and returns (next_ptr, rel_base, hit). hit is None, the address of a write
+    into watched code or FAULT if an instruction touched memory outside of the
+    cell list. In the last case next_ptr is the faulting instruction, which
+    has not been executed.
+
+    Operand words whose address is in dynamic are read from memory at runtime
+    instead of being baked into the generated code.
+    """
+    lines = []
+    names = count()
+
+    def operand(addr):
+        if addr in dynamic:
+            return f"mem[{addr}]"
+        return str(mem[addr])
+
+    def address(addr, mode):
+        # Constant addresses are checked here, anything computed at runtime is
+        # checked by the generated code
+        value = operand(addr)
+        if mode == Mode.POS and addr not in dynamic:
+            if mem[addr] < 0:
+                lines.append("        raise IndexError()")
+            return value
+        elif mode == Mode.POS or mode == Mode.RELATIVE:
+            name = f"a{next(names)}"
+            if mode == Mode.RELATIVE:
+                value = f"rb + {value}"
+            lines.append(f"        {name} = {value}")
+            lines.append(f"        if {name} < 0:")
+            lines.append(f"            raise IndexError()")
+            return name
+        raise ValueError(f"Unknown address mode {mode!r}")
+
+    def read_param(addr, mode):
+        if mode == Mode.IMMEDIATE:
+            return operand(addr)
+        return f"mem[{address(addr, mode)}]"
+
+    def write_param(addr, mode):
+        if mode == Mode.IMMEDIATE:
+            raise ValueError("Output parameters can't be immediate")
+        return address(addr, mode)
+
+    addr = start
+    for addr, op in instructions:
+        code = op.code
+        m1, m2, m3 = op.modes
+        next_addr = addr + num_params[code] + 1
+        lines.append(f"        # {addr}: {code.name}")
+        lines.append(f"        ip = {addr}")
+
+        if code in (Op.ADD, Op.MUL, Op.LT, Op.EQ):
+            a = read_param(addr + 1, m1)
+            b = read_param(addr + 2, m2)
+            expr = {
+                Op.ADD: f"{a} + {b}",
+                Op.MUL: f"{a} * {b}",
+                Op.LT: f"1 if {a} < {b} else 0",
+                Op.EQ: f"1 if {a} == {b} else 0",
+            }[code]
+            target = write_param(addr + 3, m3)
+            lines.append(f"        mem[{target}] = {expr}")
+            lines.append(f"        if {target} in code:")
+            lines.append(f"            return {next_addr}, rb, {target}")
+        elif code in (Op.JMP_IF_TRUE, Op.JMP_IF_FALSE):
+            cond = read_param(addr + 1, m1)
+            if code is Op.JMP_IF_FALSE:
+                cond = f"not {cond}"
+            target = read_param(addr + 2, m2)
+            lines.append(f"        if {cond}:")
+            lines.append(f"            return {target}, rb, None")
+        elif code is Op.SET_REL_BASE:
+            lines.append(f"        rb += {read_param(addr + 1, m1)}")
+        else:
+            raise ValueError(f"Can't compile {code!r}")
+        addr = next_addr
+
+    return "\n".join(
+        [
+            f"def block_{start}(mem, rb, code):",
+            "    try:",
+            *lines,
+            f"        return {addr}, rb, None",
+            "    except IndexError:",
+            f"        return ip, rb, {FAULT}",
+        ]
+    )
+
+
+class CompiledInterpreter(FusedInterpreter):
+    """
+    Interpreter that compiles basic blocks into Python functions the first
+    time they are executed. Writes into memory that a compiled block was built
+    from invalidate that block. Operand words that are written to are read at
+    runtime when the block is recompiled, and instructions that keep changing
+    are interpreted instead of compiled.
+
+    INPUT and OUTPUT are handed to the caller through step_until_halt() like
+    for every other interpreter.
+    """
+
+    def __init__(self, program, op_overrides=None):
+        super().__init__(program, op_overrides)
+        if self.ops:
+            raise ValueError("Op overrides are not supported by the compiler")
+        self.reset_blocks()
+
+    def reset_blocks(self):
+        # Start address -> Block
+        self.blocks = {}
+
+        # Address -> set of start addresses of blocks compiled from the address
+        self.code = {}
+
+        # Operand addresses that must be read at runtime
+        self.dynamic = set()
+
+        # Instruction addresses that must be interpreted, and the number of
+        # times each instruction word has been overwritten
+        self.interpreted = set()
+        self.rewrites = {}
+
+    def fork(self):
+        other = super().fork()
+        other.blocks = dict(self.blocks)
+        other.code = {addr: set(starts) for addr, starts in self.code.items()}
+        other.dynamic = set(self.dynamic)
+        other.interpreted = set(self.interpreted)
+        other.rewrites = dict(self.rewrites)
+        return other
+
+    def restore(self, snapshot):
+        # Blocks were compiled from the memory we are about to replace
+        super().restore(snapshot)
+        self.reset_blocks()
+
+    def step_until_halt(self):
+        instrumented = self.instrumented_step_until_halt()
+        if instrumented is not None:
+            # Instrumented machines interpret every instruction, so compiled
+            # blocks would not notice the caller writing input into code
+            self.reset_blocks()
+            yield from instrumented
+            return
+
+        while True:
+            op = self.run_until_io()
+            if op is None:
+                return
+
+            if op.code is Op.INPUT:
+                target = self.program[self.ptr]
+                if op.modes[0] == Mode.RELATIVE:
+                    target += self.rel_base
+
+                yield op
+
+                # The caller writes the input, which may end up in code
+                if target in self.code:
+                    self.invalidate(target)
+            else:
+                yield op
+
+    def run_until_io(self):
+        mem = self.program.writable()
+        blocks = self.blocks
+        code = self.code
+        ip = self.ptr
+        rb = self.rel_base
+
+        while True:
+            block = blocks.get(ip)
+            if block is None:
+                op = decode_opcode(self.program[ip])
+                if op.code in block_barriers:
+                    self.ptr = ip + 1
+                    self.rel_base = rb
+                    return None if op.code is Op.EXIT else op
+                elif ip in self.interpreted:
+                    self.ptr = ip
+                    self.rel_base = rb
+                    self.interpret_one()
+                    ip = self.ptr
+                    rb = self.rel_base
+                    continue
+                block = self.load_block(ip)
+
+            ip, rb, hit = block.func(mem, rb, code)
+            if hit is None:
+                continue
+            elif hit == FAULT:
+                # Let the interpreter grow memory, or raise a proper error
+                self.ptr = ip
+                self.rel_base = rb
+                self.interpret_one()
+                ip = self.ptr
+                rb = self.rel_base
+            else:
+                self.invalidate(hit)
+
+    def interpret_one(self):
+        target = super().interpret_one()
+        if target is not None and target in self.code:
+            self.invalidate(target)
+        return target
+
+    def load_block(self, start):
+        mem = self.program
+        instructions = scan_block(mem, start, self.interpreted)
+
+        cells = []
+        for addr, op in instructions:
+            cells.append(addr)
+            cells.extend(
+                a
+                for a in range(addr + 1, addr + num_params[op.code] + 1)
+                if a not in self.dynamic
+            )
+        cells = tuple(cells)
+
+        key = (start, tuple(mem[a] for a in cells), cells)
+        func = _block_cache.get(key)
+        if func is None:
+            source = compile_block(mem, start, instructions, self.dynamic)
+            namespace = {}
+            exec(source, namespace)
+            func = _block_cache[key] = namespace[f"block_{start}"]
+
+        block = self.blocks[start] = Block(
+            start, cells, frozenset(addr for addr, _ in instructions), func
+        )
+        for addr in cells:
+            self.code.setdefault(addr, set()).add(start)
+        return block
+
+    def invalidate(self, addr):
+        """Drop every compiled block that was built from the given address"""
+        starts = self.code.pop(addr, ())
+        is_instruction = addr in self.rewrites or any(
+            addr in self.blocks[start].instructions for start in starts
+        )
+
+        for start in starts:
+            block = self.blocks.pop(start)
+            for cell in block.cells:
+                if cell == addr:
+                    continue
+                starts = self.code.get(cell)
+                if starts is not None:
+                    starts.discard(start)
+                    if not starts:
+                        del self.code[cell]
+
+        # Figure out whether the address is an opcode or an operand. Operands
+        # are read at runtime from now on, while instructions that keep
+        # changing are eventually interpreted
+        if is_instruction:
+            rewrites = self.rewrites.get(addr, 0) + 1
+            self.rewrites[addr] = rewrites
+            if rewrites > max_recompiles:
+                self.interpreted.add(addr)
+        else:
+            self.dynamic.add(addr)
@@ -0,0 +1,75 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from .intcode import InterpreterBase
+
+
+class Profile:
+    """
+    Execution statistics for one or more Intcode machines. Counts are keyed by
+    Op and by instruction address. Times are wall clock seconds, so for
+    machines that run concurrently input time includes the time other
+    machines spent executing.
+
+    Profiled machines execute one instruction at a time instead of using their
+    fast path, so instructions per second measures the profiled run.
+    """
+
+    def __init__(self):
+        self.machines = 0
+        self.opcodes = Counter()
+        self.addresses = Counter()
+        self.exec_time = 0.0
+        self.input_time = 0.0
+        self.output_time = 0.0
+
+    @property
+    def instructions(self):
+        return sum(self.opcodes.values())
+
+    @property
+    def instructions_per_second(self):
+        if not self.exec_time:
+            return 0.0
+        return self.instructions / self.exec_time
+
+    def hottest(self, n=10):
+        """Return the n most executed addresses as (addr, count) pairs"""
+        return self.addresses.most_common(n)
+
+    def report(self, n=10):
+        total = self.instructions
+        lines = [
+            f"Machines:       {self.machines}",
+            f"Instructions:   {total}",
+            f"Executing:      {self.exec_time:.3f}s",
+            f"Blocked input:  {self.input_time:.3f}s",
+            f"Blocked output: {self.output_time:.3f}s",
+            f"Instructions/s: {self.instructions_per_second:.0f}",
+            "",
+            "Opcode          Count       %",
+        ]
+        for code, count in self.opcodes.most_common():
+            lines.append(f"{code.name:<12} {count:>8} {100 * count / total:>7.2f}")
+
+        lines.extend(["", "Address         Count       %"])
+        for addr, count in self.hottest(n):
+            lines.append(f"{addr:<12} {count:>8} {100 * count / total:>7.2f}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def profiling(profile=None):
+    """
+    Profile every Intcode machine that starts running within the block. Yields
+    the Profile that the statistics are recorded into
+    """
+    if profile is None:
+        profile = Profile()
+
+    prev = InterpreterBase.profile
+    InterpreterBase.profile = profile
+    try:
+        yield profile
+    finally:
+        InterpreterBase.profile = prev
@@ -0,0 +1,225 @@
+from contextlib import contextmanager
+
+from .intcode import InterpreterBase, Memory, Op, Snapshot
+
+# Trace files start with this, followed by one record after another. A record
+# is a tag byte and a number of zigzag encoded variable length integers
+MAGIC = b"ICT1"
+
+# Tags
+CHECKPOINT = 0  # steps, ptr, rel_base, memory size, memory cells...
+INPUT = 1  # value
+OUTPUT = 2  # value
+JUMP = 3  # target
+EXIT = 4
+
+# Flush the record buffer to the file when it grows larger than this
+buffer_size = 1 << 16
+
+
+def write_int(buf, value):
+    value = value << 1 if value >= 0 else (-value << 1) - 1
+    while value >= 0x80:
+        buf.append(value & 0x7F | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def read_int(data, pos):
+    """Return the integer at pos and the position after it"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            break
+    return (value >> 1 if not value & 1 else -((value + 1) >> 1)), pos
+
+
+class Recorder:
+    """
+    Record machine runs into binary trace files. Every taken jump, every I/O
+    value and the exit are recorded, and the complete machine state is saved
+    every checkpoint_interval instructions.
+
+    path is formatted with a running number for every machine that is
+    recorded, so "day23-{}.trace" gives one file per network machine.
+    """
+
+    def __init__(self, path, checkpoint_interval=100_000):
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.machines = 0
+
+    def record(self, machine):
+        """
+        Step machine like step_until_halt() does while recording it. Machines
+        are interpreted one instruction at a time while recorded
+        """
+        path = self.path.format(self.machines)
+        self.machines += 1
+
+        with open(path, "wb") as f:
+            buf = bytearray(MAGIC)
+            try:
+                yield from self.record_into(machine, buf, f)
+            finally:
+                f.write(buf)
+
+    def record_into(self, machine, buf, f):
+        steps = 0
+        next_checkpoint = 0
+        while True:
+            if steps == next_checkpoint:
+                buf.append(CHECKPOINT)
+                write_int(buf, steps)
+                write_int(buf, machine.ptr)
+                write_int(buf, machine.rel_base)
+                memory = list(machine.program)
+                write_int(buf, len(memory))
+                for value in memory:
+                    write_int(buf, value)
+                next_checkpoint += self.checkpoint_interval
+
+            if len(buf) > buffer_size:
+                f.write(buf)
+                buf.clear()
+
+            addr = machine.ptr
+            op = machine.read_opcode()
+            steps += 1
+            code = op.code
+
+            if code is Op.EXIT:
+                buf.append(EXIT)
+                return
+            elif machine.execute_one(op):
+                if (
+                    code is Op.JMP_IF_TRUE or code is Op.JMP_IF_FALSE
+                ) and machine.ptr != addr + 3:
+                    buf.append(JUMP)
+                    write_int(buf, machine.ptr)
+                continue
+
+            # Look at the parameter without moving the pointer, since the
+            # caller of step_until_halt() handles the instruction
+            ptr = machine.ptr
+            if code is Op.INPUT:
+                target = machine.read_output_param(op.modes[0])
+                machine.ptr = ptr
+                yield op
+                buf.append(INPUT)
+                write_int(buf, machine.program[target])
+            else:
+                value = machine.read_input_param(op.modes[0])
+                machine.ptr = ptr
+                buf.append(OUTPUT)
+                write_int(buf, value)
+                yield op
+
+
+class Checkpoint:
+    __slots__ = ("steps", "event", "ptr", "rel_base", "memory")
+
+    def __init__(self, steps, event, ptr, rel_base, memory):
+        self.steps = steps
+        self.event = event
+        self.ptr = ptr
+        self.rel_base = rel_base
+        self.memory = memory
+
+
+class Trace:
+    """
+    A recorded run. events is a list of (tag, value) pairs in the order they
+    happened and checkpoints lists the saved states. Checkpoint.event is the
+    index of the first event after the checkpoint
+    """
+
+    def __init__(self, events, checkpoints):
+        self.events = events
+        self.checkpoints = checkpoints
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not an Intcode trace")
+
+        events = []
+        checkpoints = []
+        pos = len(MAGIC)
+        while pos < len(data):
+            tag = data[pos]
+            pos += 1
+            if tag == CHECKPOINT:
+                steps, pos = read_int(data, pos)
+                ptr, pos = read_int(data, pos)
+                rel_base, pos = read_int(data, pos)
+                size, pos = read_int(data, pos)
+                memory = []
+                for _ in range(size):
+                    value, pos = read_int(data, pos)
+                    memory.append(value)
+                checkpoints.append(
+                    Checkpoint(steps, len(events), ptr, rel_base, memory)
+                )
+            elif tag in (INPUT, OUTPUT, JUMP):
+                value, pos = read_int(data, pos)
+                events.append((tag, value))
+            elif tag == EXIT:
+                events.append((tag, None))
+            else:
+                raise ValueError(f"Unknown trace record {tag} at {pos - 1}")
+        return cls(events, checkpoints)
+
+    @property
+    def halted(self):
+        return bool(self.events) and self.events[-1][0] == EXIT
+
+    def values(self, tag, checkpoint=0):
+        start = self.checkpoints[checkpoint].event
+        return [value for t, value in self.events[start:] if t == tag]
+
+    def inputs(self, checkpoint=0):
+        """Return the inputs read after the given checkpoint"""
+        return self.values(INPUT, checkpoint)
+
+    def outputs(self, checkpoint=0):
+        """Return the outputs written after the given checkpoint"""
+        return self.values(OUTPUT, checkpoint)
+
+    def jumps(self, checkpoint=0):
+        return self.values(JUMP, checkpoint)
+
+    def seek(self, machine, checkpoint):
+        """
+        Put machine in the state it had at the given checkpoint. Return the
+        inputs it read from there, so it can be resumed live
+        """
+        cp = self.checkpoints[checkpoint]
+        if isinstance(machine.program, Memory):
+            program = Memory(cp.memory)
+        else:
+            program = list(cp.memory)
+        machine.restore(Snapshot(program, cp.ptr, cp.rel_base))
+        return self.inputs(checkpoint)
+
+
+@contextmanager
+def tracing(path, checkpoint_interval=100_000):
+    """
+    Record every Intcode machine that starts running within the block. See
+    Recorder for the meaning of path
+    """
+    recorder = Recorder(path, checkpoint_interval)
+    prev = InterpreterBase.trace
+    InterpreterBase.trace = recorder
+    try:
+        yield recorder
+    finally:
+        InterpreterBase.trace = prev
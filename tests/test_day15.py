@@ -1,8 +1,7 @@
-import asyncio
 import pytest
 
 from aoc.plane import Coord
-from aoc.day15 import explore_maze, Maze, solve
+from aoc.day15 import explore_maze, map_maze, Maze, solve
 from aoc.intcode import load_program_from_file
 
 
@@ -92,7 +91,11 @@ def maze(maze_lines, maze_relative_origin):
 
 
 def test_maze_exploration(intcode, maze, maze_end):
-    assert asyncio.run(explore_maze(intcode)) == (maze, maze_end)
+    assert explore_maze(intcode) == (maze, maze_end)
+
+
+def test_map_maze(intcode, maze, maze_end):
+    assert map_maze(intcode) == (maze, maze_end)
 
 
 def test_maze_shortest_path(maze, maze_end):
@@ -1,6 +1,14 @@
 import pytest
 
-from aoc.day2 import run_program, solve
+from aoc.day2 import (
+    Polynomial,
+    SymbolicError,
+    run_program,
+    run_symbolic,
+    solve,
+    solve_noun_and_verb,
+)
+from aoc.intcode import load_program_from_file
 
 
 @pytest.mark.parametrize(
@@ -22,3 +30,32 @@ def test_run_program(input, output):
 
 def test_solve():
     assert solve("data/day2.txt") == (3267740, 7870)
+
+
+def test_run_symbolic():
+    intcode = load_program_from_file("data/day2.txt")
+    formula = run_symbolic(intcode)
+    for noun, verb in [(12, 2), (0, 0), (99, 99), (78, 70)]:
+        assert formula(noun=noun, verb=verb) == run_program(intcode, noun, verb)[0]
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        # Copies the noun into the output operand of the instruction at 8
+        [1, 0, 0, 3, 1, 1, 12, 11, 1, 5, 5, 0, 99],
+        # The result is read through the noun
+        [1, 0, 0, 0, 99],
+    ],
+)
+def test_run_symbolic_needs_concrete_value(program):
+    with pytest.raises(SymbolicError):
+        run_symbolic(program)
+
+
+def test_solve_noun_and_verb():
+    noun = Polynomial.variable("noun")
+    verb = Polynomial.variable("verb")
+    assert solve_noun_and_verb(noun * 100 + verb, 1234) == (12, 34)
+    assert solve_noun_and_verb(noun * verb + 1, 1 + 12 * 34) == (6, 68)
+    assert solve_noun_and_verb(noun + verb, 500) is None
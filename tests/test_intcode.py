@@ -1,4 +1,18 @@
-from aoc.intcode import Mode, Op, Opcode
+import pytest
+
+from aoc.day9 import Interpreter as Day9Interpreter
+from aoc.intcode import (
+    Channel,
+    FusedInterpreter,
+    Mode,
+    Op,
+    Memory,
+    Opcode,
+    Scheduler,
+    State,
+    decode_opcode,
+    load_program_from_file,
+)
 
 
 def test_opcode():
@@ -7,3 +21,225 @@ def test_opcode():
     assert op.modes[0] == Mode.POS
     assert op.modes[1] == Mode.IMMEDIATE
     assert op.modes[2] == Mode.RELATIVE
+
+
+def test_opcode_immutable():
+    op = Opcode(1)
+    with pytest.raises(AttributeError):
+        op.code = Op.MUL
+
+
+def test_decode_opcode_cache():
+    assert decode_opcode(1002) is decode_opcode(1002)
+    assert decode_opcode(1002).code == Op.MUL
+    assert decode_opcode(1002).modes == (Mode.POS, Mode.IMMEDIATE, Mode.POS)
+
+    with pytest.raises(ValueError):
+        decode_opcode(42)
+
+
+# fmt: off
+@pytest.mark.parametrize("program, input", [
+    ([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8]),
+    ([3, 3, 1107, -1, 8, 3, 4, 3, 99], [3]),
+    ([3, 12, 6, 12, 15, 1, 13, 14, 13, 4, 13, 99, -1, 0, 1, 9], [0]),
+    ([3, 3, 1105, -1, 9, 1101, 0, 0, 12, 4, 12, 99, 1], [5]),
+    ([109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99], []),
+    ([1102, 34915192, 34915192, 7, 4, 7, 99, 0], []),
+    ([109, 10, 203, -3, 204, -3, 99], [42]),
+])
+# fmt: on
+def test_fused_interpreter(program, input):
+    expected = list(Day9Interpreter.run_program(program, input))
+    assert list(FusedInterpreter.run_program(program, input)) == expected
+
+
+def test_fused_interpreter_boost():
+    intcode = load_program_from_file("data/day9.txt")
+    assert list(FusedInterpreter.run_program(intcode, [1])) == [3100786347]
+
+
+def test_fused_interpreter_op_overrides():
+    calls = []
+
+    def trace_add(op):
+        calls.append(op)
+        computer.ptr += 3
+
+    computer = FusedInterpreter([1, 0, 0, 0, 99], {Op.ADD: trace_add})
+    assert list(computer.step_until_halt()) == []
+    assert calls == [decode_opcode(1)]
+    assert computer.program[0] == 1
+
+
+def test_memory():
+    mem = Memory([1, 2, 3])
+    assert len(mem) == 3
+    assert mem[2] == 3
+    assert mem[5000] == 0
+    assert len(mem) == 3
+
+    mem[5000] = 7
+    assert mem[5000] == 7
+    assert len(mem) % Memory.page_size == 0
+    assert list(mem)[:3] == [1, 2, 3]
+
+    with pytest.raises(IndexError):
+        mem[-1]
+    with pytest.raises(IndexError):
+        mem[-1] = 1
+
+
+@pytest.mark.parametrize("cls", [Day9Interpreter, FusedInterpreter])
+def test_negative_address(cls):
+    with pytest.raises(IndexError):
+        list(cls.run_program([1, -1, 0, 0, 99]))
+    with pytest.raises(IndexError):
+        list(cls.run_program([109, -5, 22201, 0, 0, 0, 99]))
+    with pytest.raises(IndexError):
+        list(cls.run_program([1105, 1, -2, 99]))
+
+
+def send_input(computer, value):
+    """Feed one input value and return the next output"""
+    it = computer.step_until_halt()
+    op = next(it)
+    assert op.code == Op.INPUT
+    computer.program[computer.read_output_param(op.modes[0])] = value
+
+    op = next(it)
+    assert op.code == Op.OUTPUT
+    return computer.read_input_param(op.modes[0])
+
+
+# Adds every input to a running total at address 20 and outputs the total
+accumulator = [3, 21, 1, 20, 21, 20, 4, 20, 1105, 1, 0]
+
+
+@pytest.mark.parametrize("cls", [Day9Interpreter, FusedInterpreter])
+def test_fork(cls):
+    computer = cls(accumulator)
+    assert send_input(computer, 5) == 5
+
+    fork = computer.fork()
+    assert send_input(fork, 10) == 15
+    assert send_input(computer, 1) == 6
+    assert send_input(fork, 10) == 25
+    assert computer.program[20] == 6
+
+    # Instruction handlers must operate on the fork, not the original
+    assert all(getattr(func, "__self__", fork) is fork for func in fork.ops.values())
+
+
+@pytest.mark.parametrize("cls", [Day9Interpreter, FusedInterpreter])
+def test_snapshot_restore(cls):
+    computer = cls(accumulator)
+    assert send_input(computer, 5) == 5
+
+    snapshot = computer.snapshot()
+    assert send_input(computer, 1) == 6
+    assert send_input(computer, 1) == 7
+
+    for _ in range(2):
+        computer.restore(snapshot)
+        assert send_input(computer, 2) == 7
+
+
+def test_memory_fork():
+    mem = Memory([1, 2, 3])
+    fork = mem.fork()
+    assert fork.cells is mem.cells
+
+    fork[0] = 10
+    assert fork.cells is not mem.cells
+    assert list(mem) == [1, 2, 3]
+    assert list(fork) == [10, 2, 3]
+
+    mem[5000] = 1
+    assert fork[5000] == 0
+
+
+# Outputs its input minus one until it reads zero, then exits
+relay = [3, 15, 1006, 15, 14, 1001, 15, -1, 15, 4, 15, 1105, 1, 0, 99, 0]
+
+
+def test_scheduler_ring():
+    # Pass a value around a ring of machines until it reaches zero
+    scheduler = Scheduler()
+    channels = [Channel() for _ in range(3)]
+    processes = [
+        scheduler.add(FusedInterpreter(relay), channels[i], channels[(i + 1) % 3])
+        for i in range(3)
+    ]
+
+    channels[0].put(5)
+    scheduler.step()
+    assert list(channels[1]) == [4]
+    assert scheduler.states == [State.BLOCKED, State.READY, State.READY]
+
+    scheduler.run()
+    assert scheduler.states == [State.BLOCKED, State.BLOCKED, State.HALTED]
+    assert scheduler.idle and not scheduler.halted
+    assert not any(channels)
+
+    processes[0].input.put(0)
+    processes[1].input.put(0)
+    scheduler.run()
+    assert scheduler.halted
+
+
+def test_scheduler_blocked():
+    scheduler = Scheduler()
+    process = scheduler.add(FusedInterpreter(relay))
+    scheduler.run()
+    assert process.state is State.BLOCKED
+    assert scheduler.idle
+
+    process.input.extend([5, 3, 0])
+    assert not scheduler.idle
+    scheduler.run()
+    assert list(process.output) == [4, 2]
+    assert process.state is State.HALTED
+
+
+def test_scheduler_priority():
+    scheduler = Scheduler()
+    processes = [
+        scheduler.add(FusedInterpreter(relay), Channel([1]), priority=priority)
+        for priority in [0, 2, 1, 2]
+    ]
+
+    ran = []
+    while (process := scheduler.step()) is not None:
+        ran.append(processes.index(process))
+    assert ran == [1, 3, 2, 0]
+
+
+def test_scheduler_round_robin():
+    scheduler = Scheduler()
+    processes = [scheduler.add(FusedInterpreter(relay), Channel([1])) for _ in range(3)]
+    processes[0].input.put(2)
+
+    ran = [processes.index(scheduler.step()) for _ in range(3)]
+    assert ran == [0, 1, 2]
+
+    # A process that is woken up waits for its turn
+    processes[0].input.put(3)
+    processes[2].input.put(3)
+    ran = [processes.index(scheduler.step()) for _ in range(2)]
+    assert ran == [0, 2]
+    assert [list(p.output) for p in processes] == [[0, 1, 2], [0], [0, 2]]
+
+
+def test_scheduler_default_input():
+    scheduler = Scheduler()
+    process = scheduler.add(FusedInterpreter(accumulator), default=0)
+    scheduler.run()
+    assert process.state is State.IDLE
+    assert scheduler.idle
+    assert list(process.output) == []
+
+    process.input.put(4)
+    scheduler.run()
+    assert list(process.output) == [4, 4]
+    assert process.state is State.IDLE
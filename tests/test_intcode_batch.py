@@ -0,0 +1,66 @@
+import pytest
+
+from aoc.day19 import query_area
+from aoc.day9 import Interpreter
+from aoc.intcode import load_program_from_file
+from aoc.intcode_batch import BatchInterpreter, run_batch
+from aoc.plane import Coord
+
+
+# fmt: off
+@pytest.mark.parametrize("program", [
+    [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99],
+    [1102, 34915192, 34915192, 7, 4, 7, 99, 0],
+    [104, 1125899906842624, 99],
+    # Overflows int64
+    [1102, 3037000500, 3037000500, 7, 4, 7, 99, 0],
+    [104, 2 ** 70, 99],
+])
+# fmt: on
+def test_run_batch(program):
+    expected = list(Interpreter.run_program(program))
+    assert run_batch(program, [[], []]) == [expected, expected]
+
+
+def test_run_batch_divergent_lanes():
+    # Outputs 999 if the input is below 8, 1000 if it's 8 and 1001 otherwise
+    # fmt: off
+    program = [
+        3, 21, 1008, 21, 8, 20, 1005, 20, 22, 1107, 8, 21, 20, 1006, 20, 31,
+        1106, 0, 36, 98, 0, 0, 1002, 21, 125, 20, 4, 20, 1105, 1, 46, 104,
+        999, 1105, 1, 46, 1101, 1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99,
+    ]
+    # fmt: on
+    inputs = [[i] for i in range(4, 12)]
+    expected = [list(Interpreter.run_program(program, i)) for i in inputs]
+    assert run_batch(program, inputs) == expected
+
+
+def test_run_batch_self_modifying_lanes():
+    # The input is written into the operand of an ADD
+    program = [3, 4, 1101, 1, 0, 9, 4, 9, 99, 0]
+    assert run_batch(program, [[1], [2], [3]]) == [[2], [3], [4]]
+
+    # The input becomes the instruction word at address 2
+    program = [3, 2, 0, 3, 4, 10, 4, 10, 99, 0, 0]
+    assert run_batch(program, [[1101], [1102]]) == [[7], [12]]
+
+
+def test_batch_patch():
+    batch = BatchInterpreter([1, 0, 0, 0, 99], 3)
+    batch.patch(1, [0, 4, 4])
+    batch.patch(2, [0, 0, 4])
+    assert batch.run() == [[], [], []]
+    assert batch.memory[:, 0].tolist() == [2, 100, 198]
+
+
+def test_run_batch_boost():
+    intcode = load_program_from_file("data/day9.txt")
+    assert run_batch(intcode, [[1], [1]]) == [[3100786347], [3100786347]]
+
+
+def test_run_batch_beam_area():
+    intcode = load_program_from_file("data/day19.txt")
+    coords = [Coord(x, y) for y in range(50) for x in range(50)]
+    beam = {c for c, (pulled,) in zip(coords, run_batch(intcode, coords)) if pulled}
+    assert beam == query_area(intcode, 50, 50)
@@ -0,0 +1,80 @@
+import pytest
+
+from aoc.day9 import Interpreter
+from aoc.intcode import load_program_from_file
+from aoc.intcode_jit import CompiledInterpreter
+
+
+# fmt: off
+@pytest.mark.parametrize("program, input", [
+    ([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8]),
+    ([3, 12, 6, 12, 15, 1, 13, 14, 13, 4, 13, 99, -1, 0, 1, 9], [0]),
+    ([109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99], []),
+    # Patches the operand of the instruction at 4 until it reaches 10
+    ([1001, 6, 1, 6, 1101, 0, 0, 20, 1007, 6, 10, 21, 1005, 21, 0, 4, 20, 99], []),
+    # Patches its first ADD into a MUL
+    ([
+        1101, 3, 4, 30, 4, 30, 1008, 0, 1102, 31, 1005, 31, 20, 1101, 1102, 0,
+        0, 1105, 1, 0, 99,
+    ], []),
+    # Input is written straight into an operand of an already compiled block
+    ([1101, 0, 0, 20, 4, 20, 3, 2, 1005, 2, 0, 99], [5, 7, 0]),
+])
+# fmt: on
+def test_compiled_interpreter(program, input):
+    expected = list(Interpreter.run_program(program, input))
+    assert list(CompiledInterpreter.run_program(program, input)) == expected
+
+
+def test_compiled_interpreter_falls_back_on_rewritten_opcodes():
+    # Toggles the opcode at address 0 between ADD and MUL 20 times
+    # fmt: off
+    program = [
+        1101, 1, 1, 40, 4, 40, 1001, 41, 1, 41, 1007, 41, 20, 42, 1006, 42, 28,
+        1008, 0, 1101, 43, 1001, 43, 1101, 0, 1105, 1, 0, 99,
+    ]
+    # fmt: on
+    computer = CompiledInterpreter(program)
+    output = [
+        computer.read_input_param(op.modes[0]) for op in computer.step_until_halt()
+    ]
+    assert output == [2, 1] * 10
+    assert 0 in computer.interpreted
+
+
+def test_compiled_interpreter_boost():
+    intcode = load_program_from_file("data/day9.txt")
+    assert list(CompiledInterpreter.run_program(intcode, [2])) == [87023]
+
+
+def test_compiled_interpreter_negative_address():
+    with pytest.raises(IndexError):
+        list(CompiledInterpreter.run_program([1, -1, 0, 0, 99]))
+    with pytest.raises(IndexError):
+        list(CompiledInterpreter.run_program([109, -5, 22201, 0, 0, 0, 99]))
+    with pytest.raises(IndexError):
+        list(CompiledInterpreter.run_program([1105, 1, -2, 99]))
+
+
+def test_compiled_interpreter_fork_and_restore():
+    # Input is written into the operand of the ADD at address 2
+    program = [3, 4, 1101, 0, 0, 20, 4, 20, 1105, 1, 0]
+    computer = CompiledInterpreter(program)
+    it = computer.step_until_halt()
+    next(it)
+    computer.program[computer.read_output_param(0)] = 5
+    next(it)
+    assert computer.read_input_param(0) == 5
+
+    snapshot = computer.snapshot()
+    fork = computer.fork()
+    for machine, value in [(fork, 7), (computer, 9)]:
+        it = machine.step_until_halt()
+        next(it)
+        machine.program[machine.read_output_param(0)] = value
+        next(it)
+        assert machine.read_input_param(0) == value
+
+    computer.restore(snapshot)
+    assert computer.program[4] == 5
+    assert not computer.blocks
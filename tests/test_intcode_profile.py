@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from aoc.day9 import Interpreter as Day9Interpreter
+from aoc.intcode import FusedInterpreter, InterpreterBase, Op, load_program_from_file
+from aoc.intcode_jit import CompiledInterpreter
+from aoc.intcode_profile import Profile, profiling
+
+# Counts down from the input and outputs each value
+countdown = [3, 12, 4, 12, 1001, 12, -1, 12, 1005, 12, 2, 99, 0]
+
+
+@pytest.mark.parametrize(
+    "cls", [Day9Interpreter, FusedInterpreter, CompiledInterpreter]
+)
+def test_profile(cls):
+    profile = Profile()
+    output = list(cls.run_program(countdown, [3], profile=profile))
+    assert output == [3, 2, 1]
+
+    assert profile.machines == 1
+    assert profile.opcodes == {
+        Op.INPUT: 1,
+        Op.OUTPUT: 3,
+        Op.ADD: 3,
+        Op.JMP_IF_TRUE: 3,
+        Op.EXIT: 1,
+    }
+    assert profile.instructions == 11
+    assert profile.hottest(3) == [(2, 3), (4, 3), (8, 3)]
+    assert profile.addresses[0] == 1
+
+
+def test_profile_exit():
+    profile = Profile()
+    assert list(FusedInterpreter.run_program([99], profile=profile)) == []
+    assert profile.opcodes == {Op.EXIT: 1}
+
+
+def test_profile_input_time():
+    def slow_input():
+        time.sleep(0.05)
+        yield 1
+
+    profile = Profile()
+    list(FusedInterpreter.run_program(countdown, slow_input(), profile=profile))
+    assert profile.input_time >= 0.05
+    assert profile.exec_time < profile.input_time
+
+
+@pytest.mark.parametrize("cls", [FusedInterpreter, CompiledInterpreter])
+def test_profiling_boost(cls):
+    intcode = load_program_from_file("data/day9.txt")
+    with profiling() as profile:
+        assert list(cls.run_program(intcode, [1])) == [3100786347]
+    assert InterpreterBase.profile is None
+
+    assert profile.instructions > 0
+    assert profile.instructions_per_second > 0
+    assert "JMP_IF_FALSE" in profile.report()
@@ -0,0 +1,61 @@
+import pytest
+
+from aoc.day9 import Interpreter as Day9Interpreter
+from aoc.intcode import FusedInterpreter, InterpreterBase, Op, load_program_from_file
+from aoc.intcode_jit import CompiledInterpreter
+from aoc.intcode_trace import JUMP, Trace, read_int, tracing, write_int
+
+
+@pytest.mark.parametrize("value", [0, 1, -1, 63, -64, 64, 300, -(2**70), 2**70])
+def test_varint(value):
+    buf = bytearray()
+    write_int(buf, value)
+    assert read_int(buf, 0) == (value, len(buf))
+
+
+@pytest.mark.parametrize(
+    "cls", [Day9Interpreter, FusedInterpreter, CompiledInterpreter]
+)
+def test_record_and_replay(tmp_path, cls):
+    intcode = load_program_from_file("data/day9.txt")
+    with tracing(str(tmp_path / "boost-{}.trace"), checkpoint_interval=50):
+        output = list(cls.run_program(intcode, [1]))
+    assert InterpreterBase.trace is None
+
+    trace = Trace.load(tmp_path / "boost-0.trace")
+    assert trace.halted
+    assert trace.inputs() == [1]
+    assert trace.outputs() == output
+    assert trace.jumps()
+    assert len(trace.checkpoints) > 2
+    assert all(tag != JUMP or value >= 0 for tag, value in trace.events)
+
+    # Resuming from a checkpoint gives the outputs recorded after it
+    for checkpoint in range(len(trace.checkpoints)):
+        computer = FusedInterpreter([])
+        inputs = iter(trace.seek(computer, checkpoint))
+        replayed = []
+        for op in computer.step_until_halt():
+            if op.code == Op.INPUT:
+                target = computer.read_output_param(op.modes[0])
+                computer.program[target] = next(inputs)
+            else:
+                replayed.append(computer.read_input_param(op.modes[0]))
+        assert replayed == trace.outputs(checkpoint)
+
+
+def test_trace_file_per_machine(tmp_path):
+    with tracing(str(tmp_path / "{}.trace")):
+        for i in range(3):
+            assert list(FusedInterpreter.run_program([3, 5, 4, 5, 99, 0], [i])) == [i]
+
+    for i in range(3):
+        trace = Trace.load(tmp_path / f"{i}.trace")
+        assert trace.outputs() == [i]
+
+
+def test_not_a_trace(tmp_path):
+    path = tmp_path / "foo.trace"
+    path.write_bytes(b"1,2,3")
+    with pytest.raises(ValueError):
+        Trace.load(path)